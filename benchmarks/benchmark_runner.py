@@ -3,14 +3,24 @@
 Generic benchmark runner that can be extended for different databases.
 """
 import time
-import statistics
+import math
 import logging
 import json
+import re
+import io
 import os
+import sys
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from functools import lru_cache
+from operator import itemgetter
 from typing import List, Dict, Any, Optional, Union
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,18 +28,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger('benchmark_runner')
 
+# Matches a trailing FORMAT clause so one is not appended twice
+_FORMAT_CLAUSE_RE = re.compile(r'\bFORMAT\s+\w+\s*;?\s*$', re.IGNORECASE)
+
 
-@dataclass
+@dataclass(slots=True)
 class QueryBenchmark:
     """Definition of a benchmark query."""
     name: str
     query: str
     description: str
     run_count: int = 3
+    warmup_runs: int = 0
+    # Drop server caches before the first measured run (cold-cache
+    # measurement) or before every run; the default measures warm runs
+    cold_cache: bool = False
+    drop_caches_each_run: bool = False
     results: List[Dict[str, Any]] = field(default_factory=list)
+    warmup_results: List[Dict[str, Any]] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class BenchmarkResult:
     """Results of a benchmark run."""
     query_name: str
@@ -42,6 +61,26 @@ class BenchmarkResult:
     additional_metrics: Dict[str, Any] = field(default_factory=dict)
 
 
+def make_result_dict(query_name: str, execution_time: float, memory_usage: float,
+                     rows_read: int, bytes_read: int, rows_returned: int,
+                     query: str, additional_metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build a result dict with the same shape as BenchmarkResult without
+    allocating a dataclass instance just to copy its __dict__. Used on the
+    hot result-construction path; BenchmarkResult remains the public type.
+    """
+    return {
+        "query_name": query_name,
+        "execution_time": execution_time,
+        "memory_usage": memory_usage,
+        "rows_read": rows_read,
+        "bytes_read": bytes_read,
+        "rows_returned": rows_returned,
+        "query": query,
+        "additional_metrics": additional_metrics if additional_metrics is not None else {}
+    }
+
+
 class BenchmarkRunner(ABC):
     """Abstract base class for database benchmarks."""
     
@@ -62,28 +101,39 @@ class BenchmarkRunner(ABC):
         """Run a single benchmark query and measure performance. To be implemented by subclasses."""
         pass
     
-    def add_benchmark(self, name: str, query: str, description: str, run_count: int = 3):
+    def add_benchmark(self, name: str, query: str, description: str, run_count: int = 3,
+                      warmup_runs: int = 0):
         """Add a benchmark query to the list."""
-        self.benchmarks.append(QueryBenchmark(name, query, description, run_count))
+        self.benchmarks.append(QueryBenchmark(name, query, description, run_count, warmup_runs))
         logger.info(f"Added benchmark: {name}")
-    
-    def add_benchmark_from_dict(self, benchmark_dict: Dict[str, Any]):
+
+    def add_benchmark_from_dict(self, benchmark_dict: Dict[str, Any], default_run_count: int = 3):
         """Add a benchmark from a dictionary definition."""
         name = benchmark_dict.get("name")
         query = benchmark_dict.get("query")
         description = benchmark_dict.get("description", "")
-        run_count = benchmark_dict.get("run_count", 3)
-        
+        run_count = benchmark_dict.get("run_count", default_run_count)
+        warmup_runs = benchmark_dict.get("warmup_runs", 0)
+
         if not name or not query:
             logger.error("Benchmark missing required name or query fields")
             return
-        
-        self.add_benchmark(name, query, description, run_count)
+
+        # format_null discards the result server-side so the measurement
+        # isolates execution from wire serialization and client decode
+        if benchmark_dict.get("format_null") and not _FORMAT_CLAUSE_RE.search(query):
+            query = f"{query.rstrip()} FORMAT Null"
+
+        self.add_benchmark(name, query, description, run_count, warmup_runs)
     
-    def add_benchmarks_from_list(self, benchmarks: List[Dict[str, Any]]):
-        """Add multiple benchmarks from a list of dictionary definitions."""
+    def add_benchmarks_from_list(self, benchmarks: List[Dict[str, Any]], default_run_count: int = 3):
+        """
+        Add multiple benchmarks from a list of dictionary definitions.
+        default_run_count applies only to definitions without an explicit
+        run_count, so per-query overrides are never clobbered.
+        """
         for benchmark in benchmarks:
-            self.add_benchmark_from_dict(benchmark)
+            self.add_benchmark_from_dict(benchmark, default_run_count)
     
     def run_all_benchmarks(self):
         """Run all benchmark queries."""
@@ -91,17 +141,25 @@ class BenchmarkRunner(ABC):
             logger.error("Not connected to database. Call connect() first.")
             return None
         
-        logger.info(f"Starting {self.db_name} benchmark run...")
-        
+        logger.info("Starting %s benchmark run...", self.db_name)
+
         for benchmark in self.benchmarks:
-            logger.info(f"Running benchmark: {benchmark.name}")
-            logger.info(f"Description: {benchmark.description}")
-            
+            # One line per benchmark; per-run progress only at DEBUG. Lazy
+            # %-formatting keeps the calls free when the level is disabled.
+            logger.info("Running benchmark: %s (%s)", benchmark.name, benchmark.description)
+
+            # Warmup runs pay the first-call costs (cache warm-up, TLS
+            # session setup) without polluting the measured statistics
+            for i in range(benchmark.warmup_runs):
+                logger.debug("Warmup run %d/%d", i + 1, benchmark.warmup_runs)
+                result = self._run_benchmark_query(benchmark.name, benchmark.query)
+                benchmark.warmup_results.append(result)
+
             for i in range(benchmark.run_count):
-                logger.info(f"Run {i+1}/{benchmark.run_count}")
+                logger.debug("Run %d/%d", i + 1, benchmark.run_count)
                 result = self._run_benchmark_query(benchmark.name, benchmark.query)
                 benchmark.results.append(result)
-        
+
         logger.info("All benchmarks completed")
         return self.format_results()
     
@@ -113,53 +171,60 @@ class BenchmarkRunner(ABC):
             "detailed_results": {}
         }
         
+        metric_keys = ("execution_time", "memory_usage", "rows_read", "bytes_read", "rows_returned")
+        extra_keys = ("written_rows", "written_bytes", "result_bytes")
+        # One C-level fetch per row instead of a dict subscript per metric
+        metric_getter = itemgetter(*metric_keys, "additional_metrics")
+
         for benchmark in self.benchmarks:
-            # Calculate stats
-            execution_times = [r["execution_time"] for r in benchmark.results]
-            memory_usages = [r["memory_usage"] for r in benchmark.results]
-            rows_read = [r["rows_read"] for r in benchmark.results]
-            bytes_read = [r["bytes_read"] for r in benchmark.results]
-            
-            # Process additional metrics if available
-            written_rows = [r["additional_metrics"].get("written_rows", 0) for r in benchmark.results]
-            written_bytes = [r["additional_metrics"].get("written_bytes", 0) for r in benchmark.results]
-            result_bytes = [r["additional_metrics"].get("result_bytes", 0) for r in benchmark.results]
-            
-            avg_time = statistics.mean(execution_times) if execution_times else 0
-            avg_memory = statistics.mean(memory_usages) if memory_usages else 0
-            avg_rows_read = statistics.mean(rows_read) if rows_read else 0
-            avg_bytes_read = statistics.mean(bytes_read) if bytes_read else 0
-            avg_written_rows = statistics.mean(written_rows) if written_rows else 0
-            avg_written_bytes = statistics.mean(written_bytes) if written_bytes else 0
-            avg_result_bytes = statistics.mean(result_bytes) if result_bytes else 0
-            
-            if len(execution_times) > 1:
-                std_dev_time = statistics.stdev(execution_times)
-                std_dev_memory = statistics.stdev(memory_usages) if any(memory_usages) else 0
-                std_dev_rows_read = statistics.stdev(rows_read) if any(rows_read) else 0
-                std_dev_bytes_read = statistics.stdev(bytes_read) if any(bytes_read) else 0
-            else:
-                std_dev_time = 0
-                std_dev_memory = 0
-                std_dev_rows_read = 0
-                std_dev_bytes_read = 0
-            
+            # Calculate stats in a single pass over the results, accumulating
+            # running sums and sums of squares per metric
+            n = len(benchmark.results)
+            sums = dict.fromkeys(metric_keys + extra_keys, 0.0)
+            sum_sqs = dict.fromkeys(metric_keys, 0.0)
+            nonzero = dict.fromkeys(metric_keys, False)
+
+            for r in benchmark.results:
+                *values, additional = metric_getter(r)
+                for key, value in zip(metric_keys, values):
+                    sums[key] += value
+                    sum_sqs[key] += value * value
+                    if value:
+                        nonzero[key] = True
+
+                # Process additional metrics if available
+                for key in extra_keys:
+                    sums[key] += additional.get(key, 0)
+
+            def mean(key):
+                return sums[key] / n if n else 0
+
+            def stdev(key):
+                # All-zero metrics were flagged during accumulation, so the
+                # sqrt work can be skipped without re-scanning the values
+                if n <= 1 or not nonzero[key]:
+                    return 0
+                m = sums[key] / n
+                # Sample standard deviation from the accumulated moments
+                return math.sqrt(max(0.0, (sum_sqs[key] - n * m * m) / (n - 1)))
+
             # Add summary
             results["benchmark_summary"].append({
                 "name": benchmark.name,
                 "description": benchmark.description,
-                "avg_execution_time": avg_time,
-                "std_dev_time": std_dev_time,
-                "avg_memory_usage": avg_memory,
-                "std_dev_memory": std_dev_memory,
-                "avg_rows_read": avg_rows_read,
-                "std_dev_rows_read": std_dev_rows_read,
-                "avg_bytes_read": avg_bytes_read,
-                "std_dev_bytes_read": std_dev_bytes_read,
-                "avg_written_rows": avg_written_rows,
-                "avg_written_bytes": avg_written_bytes,
-                "avg_result_bytes": avg_result_bytes,
-                "runs": len(benchmark.results)
+                "avg_execution_time": mean("execution_time"),
+                "std_dev_time": stdev("execution_time"),
+                "avg_memory_usage": mean("memory_usage"),
+                "std_dev_memory": stdev("memory_usage"),
+                "avg_rows_read": mean("rows_read"),
+                "std_dev_rows_read": stdev("rows_read"),
+                "avg_bytes_read": mean("bytes_read"),
+                "std_dev_bytes_read": stdev("bytes_read"),
+                "avg_rows_returned": mean("rows_returned"),
+                "avg_written_rows": mean("written_rows"),
+                "avg_written_bytes": mean("written_bytes"),
+                "avg_result_bytes": mean("result_bytes"),
+                "runs": n
             })
             
             # Add detailed results
@@ -169,21 +234,35 @@ class BenchmarkRunner(ABC):
     
     def save_results_to_file(self, results: Dict[str, Any], filename: str):
         """Save benchmark results to a JSON file."""
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        if orjson is not None:
+            # orjson serializes in C (and handles datetime values from
+            # benchmark_table_info directly), writing bytes in one shot
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(filename, 'w') as f:
+                json.dump(results, f, indent=2, default=str)
         logger.info(f"Results saved to {filename}")
     
     def print_summary_table(self, results: Dict[str, Any]):
         """Print a formatted summary table of benchmark results."""
         summary = results["benchmark_summary"]
         detailed_results = results["detailed_results"]
-        
-        # Print header
-        print("\n" + "=" * 140)
-        print(f"{'Query Name':<35} | {'Avg Time (s)':<12} | {'Memory':<12} | {'Rows Read':<12} | {'Data Read':<12} | {'Rows Written':<12} | {'Description':<30}")
-        print("-" * 120)
-        
-        # Print rows
+
+        # Build the whole report in a buffer and write it out in one go,
+        # instead of one print (and stdout flush) per row
+        out = io.StringIO()
+
+        def line(text=""):
+            out.write(text)
+            out.write("\n")
+
+        # Header
+        line("\n" + "=" * 140)
+        line(f"{'Query Name':<35} | {'Avg Time (s)':<12} | {'Memory':<12} | {'Rows Read':<12} | {'Data Read':<12} | {'Rows Written':<12} | {'Description':<30}")
+        line("-" * 120)
+
+        # Rows
         for item in summary:
             name = item["name"]
             avg_time = f"{item['avg_execution_time']:.4f}"
@@ -192,70 +271,76 @@ class BenchmarkRunner(ABC):
             avg_bytes_read = self._format_bytes(item['avg_bytes_read'])
             avg_written_rows = f"{item['avg_written_rows']:,.0f}"
             desc = item["description"][:30]
-            
-            print(f"{name[:35]:<35} | {avg_time:<12} | {avg_mem:<12} | {avg_rows_read:<12} | {avg_bytes_read:<12} | {avg_written_rows:<12} | {desc:<30}")
-        
-        print("=" * 140 + "\n")
-        
-        # Print expanded metrics table
-        print("\nEXPANDED METRICS\n" + "=" * 140)
-        print(f"{'Query Name':<35} | {'Data Written':<12} | {'Result Rows':<12} | {'Result Bytes':<12} | {'Runs':<5}")
-        print("-" * 140)
-        
-        # Print rows
+
+            line(f"{name[:35]:<35} | {avg_time:<12} | {avg_mem:<12} | {avg_rows_read:<12} | {avg_bytes_read:<12} | {avg_written_rows:<12} | {desc:<30}")
+
+        line("=" * 140 + "\n")
+
+        # Expanded metrics table
+        line("\nEXPANDED METRICS\n" + "=" * 140)
+        line(f"{'Query Name':<35} | {'Data Written':<12} | {'Result Rows':<12} | {'Result Bytes':<12} | {'Runs':<5}")
+        line("-" * 140)
+
+        # Rows
         for item in summary:
             name = item["name"]
             avg_written_bytes = self._format_bytes(item['avg_written_bytes'])
-            avg_result_rows = f"{item.get('avg_rows_returned', 0):,.0f}"
+            avg_result_rows = f"{item['avg_rows_returned']:,.0f}"
             avg_result_bytes = self._format_bytes(item['avg_result_bytes'])
             runs = item["runs"]
-            
-            print(f"{name[:35]:<35} | {avg_written_bytes:<12} | {avg_result_rows:<12} | {avg_result_bytes:<12} | {runs:<5}")
-        
-        print("=" * 120 + "\n")
-        
-        # Check for and print information about failed queries
+
+            line(f"{name[:35]:<35} | {avg_written_bytes:<12} | {avg_result_rows:<12} | {avg_result_bytes:<12} | {runs:<5}")
+
+        line("=" * 120 + "\n")
+
+        # Check for and report information about failed queries
         failed_queries = []
         for name, results_list in detailed_results.items():
             for result in results_list:
-                if "additional_metrics" in result and "error" in result["additional_metrics"]:
+                # Bind the metrics dict once instead of re-looking it up
+                # for every field
+                metrics = result.get("additional_metrics")
+                if metrics and "error" in metrics:
                     failed_queries.append({
                         "name": name,
-                        "error": result["additional_metrics"]["error"],
-                        "error_message": result["additional_metrics"].get("error_message", "Unknown error"),
-                        "error_details": result["additional_metrics"].get("error_details", {}),
-                        "optimization_hints": result["additional_metrics"].get("optimization_hints", [])
+                        "error": metrics["error"],
+                        "error_message": metrics.get("error_message", "Unknown error"),
+                        "error_details": metrics.get("error_details", {}),
+                        "optimization_hints": metrics.get("optimization_hints", [])
                     })
-        
+
         if failed_queries:
-            print("\nFAILED QUERIES\n" + "=" * 120)
+            line("\nFAILED QUERIES\n" + "=" * 120)
             for i, failure in enumerate(failed_queries):
-                print(f"Query #{i+1}: {failure['name']}")
-                print(f"Error Type: {failure['error']}")
-                
-                # Print error details if available
+                line(f"Query #{i+1}: {failure['name']}")
+                line(f"Error Type: {failure['error']}")
+
+                # Report error details if available
                 if failure.get("error_details"):
-                    print("Error Details:")
+                    line("Error Details:")
                     for key, value in failure["error_details"].items():
-                        print(f"  - {key}: {value}")
-                
-                # Print optimization hints if available
+                        line(f"  - {key}: {value}")
+
+                # Report optimization hints if available
                 if failure.get("optimization_hints"):
-                    print("Optimization Suggestions:")
+                    line("Optimization Suggestions:")
                     for hint in failure["optimization_hints"]:
-                        print(f"  - {hint}")
-                
-                # Print a shortened version of the error message
+                        line(f"  - {hint}")
+
+                # Report a shortened version of the error message
                 error_msg = failure["error_message"]
                 if len(error_msg) > 200:
                     error_msg = error_msg[:197] + "..."
-                print(f"Error Message: {error_msg}")
-                
+                line(f"Error Message: {error_msg}")
+
                 # Add a separator between failed queries
                 if i < len(failed_queries) - 1:
-                    print("-" * 80)
-            
-            print("=" * 120 + "\n")
+                    line("-" * 80)
+
+            line("=" * 120 + "\n")
+
+        sys.stdout.write(out.getvalue())
+        sys.stdout.flush()
     
     def _format_bytes(self, size_bytes: Union[int, float, str]) -> str:
         """Format bytes to human-readable format."""
@@ -265,14 +350,22 @@ class BenchmarkRunner(ABC):
                 size_bytes = float(size_bytes)
             except (ValueError, TypeError):
                 return "0B"  # Return zero if conversion fails
-        
-        # Handle zero or None values
-        if not size_bytes:
+
+        # Handle zero, None or NaN values before hitting the cache
+        if not size_bytes or size_bytes != size_bytes:
             return "0B"
-            
-        size_name = ("B", "KB", "MB", "GB", "TB", "PB")
-        i = 0
-        while size_bytes >= 1024 and i < len(size_name) - 1:
-            size_bytes /= 1024
-            i += 1
-        return f"{size_bytes:.2f} {size_name[i]}"
\ No newline at end of file
+
+        return _format_bytes_cached(float(size_bytes))
+
+
+@lru_cache(maxsize=1024)
+def _format_bytes_cached(size_bytes: float) -> str:
+    """Format a positive byte count; memoized since the same totals repeat
+    across runs and summary rows."""
+    size_name = ("B", "KB", "MB", "GB", "TB", "PB")
+    if size_bytes <= 0:
+        return "0B"
+    # The unit index is just the base-1024 magnitude, which bit_length
+    # gives directly without a division loop
+    i = min(max(int(size_bytes).bit_length() - 1, 0) // 10, len(size_name) - 1)
+    return f"{size_bytes / (1 << (10 * i)):.2f} {size_name[i]}"
\ No newline at end of file
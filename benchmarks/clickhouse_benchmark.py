@@ -2,27 +2,100 @@
 """
 ClickHouse-specific implementation of the benchmark runner.
 """
+import asyncio
+import itertools
 import time
 import logging
 import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 import clickhouse_connect
+from clickhouse_connect.driver import httputil
 from clickhouse_connect.driver.client import Client
 from clickhouse_connect.driver.exceptions import ClickHouseError
 
-from .benchmark_runner import BenchmarkRunner, BenchmarkResult
+from .benchmark_runner import BenchmarkRunner, make_result_dict, _FORMAT_CLAUSE_RE
 
 logger = logging.getLogger('clickhouse_benchmark')
 
+# Patterns compiled once at import: the fragments extracted from
+# ClickHouse error messages. The memory details come out of a single
+# alternation so one pass over the message fills every field.
+_MEM_DETAILS_RE = re.compile(
+    r'would use (?P<would_use>[\d\.]+ [KMGTPiB]+)'
+    r'|current RSS (?P<current_rss>[\d\.]+ [KMGTPiB]+)'
+    r'|maximum: (?P<maximum>[\d\.]+ [KMGTPiB]+)'
+)
+_ERROR_CODE_RE = re.compile(r'error code (\d+)')
+
+# Maps _MEM_DETAILS_RE group names to the keys reported in error_details
+_MEM_DETAIL_KEYS = {
+    'would_use': 'requested_memory',
+    'current_rss': 'current_rss',
+    'maximum': 'maximum_memory',
+}
+
+# Unit multipliers for memory limit strings ("1KB", "9GB", ...)
+_UNIT_MULT = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+# Two bulk queries instead of SHOW TABLES plus two queries per table: one
+# aggregation over system.parts for sizes and one scan of system.columns
+# for structure
+_TABLE_SIZE_QUERY = """
+SELECT
+    table,
+    sum(bytes) as size_bytes,
+    sum(rows) as total_rows,
+    min(modification_time) as creation_time,
+    max(modification_time) as last_modified
+FROM system.parts
+WHERE database = {db:String} AND active = 1
+GROUP BY table
+"""
+
+_TABLE_COLUMNS_QUERY = """
+SELECT
+    table,
+    name,
+    type,
+    default_kind,
+    default_expression
+FROM system.columns
+WHERE database = {db:String}
+ORDER BY table, position
+"""
+
 
 class ClickHouseBenchmark(BenchmarkRunner):
     """ClickHouse specific benchmark implementation."""
     
-    def __init__(self):
-        """Initialize the ClickHouse benchmark runner."""
+    def __init__(self, max_parallel: int = 1):
+        """
+        Initialize the ClickHouse benchmark runner.
+
+        Args:
+            max_parallel: Number of benchmark runs to execute concurrently.
+                          The default of 1 preserves strictly sequential
+                          execution for apples-to-apples timing.
+        """
         super().__init__(db_name="ClickHouse")
         self.client: Optional[Client] = None
-    
+        self.max_parallel = max(1, max_parallel)
+        self._connection_params: Dict[str, Any] = {}
+        self._thread_clients = threading.local()
+        self._hosts: List[str] = []
+        # itertools.count is incremented atomically in CPython, so the
+        # round-robin host rotation is safe from worker threads
+        self._host_counter = itertools.count()
+        # Extra per-query server settings applied to every benchmark run
+        # (set from run_all_benchmarks' server_settings argument)
+        self.server_settings: Dict[str, Any] = {}
+        # Server-side query result cache policy: 'off', 'on' or
+        # 'second-onward' (set from run_all_benchmarks' result_cache)
+        self.result_cache_policy: str = 'off'
+
     def connect(self, **connection_params) -> bool:
         """Connect to the ClickHouse database."""
         host = connection_params.get('host')
@@ -31,18 +104,43 @@ class ClickHouseBenchmark(BenchmarkRunner):
         password = connection_params.get('password', '')
         database = connection_params.get('database', 'default')
         secure = connection_params.get('secure', True)
-        
+        compress = connection_params.get('compress', 'lz4')
+
+        # Optional replica/shard endpoints serving the same data; worker
+        # and async clients are rotated across them round-robin
+        alt_hosts = connection_params.get('alt_hosts') or []
+        if isinstance(alt_hosts, str):
+            alt_hosts = [h.strip() for h in alt_hosts.split(',') if h.strip()]
+        self._hosts = [host] + [h for h in alt_hosts if h != host]
+
+        # Share one keep-alive connection pool across all clients, sized to
+        # cover the parallel workers, so the many small control/stats
+        # commands reuse the same TCP+TLS connections
+        pool_mgr = httputil.get_pool_manager(maxsize=max(4, self.max_parallel))
+
+        # Keep the resolved parameters so parallel workers can create
+        # their own clients (Client is not documented thread-safe)
+        self._connection_params = {
+            'host': host,
+            'port': port,
+            'username': username,
+            'password': password,
+            'database': database,
+            'secure': secure,
+            'compress': compress,
+            'pool_mgr': pool_mgr,
+            # Be explicit: no client-side row cap on benchmark queries, and
+            # enough headroom for long-running scans
+            'query_limit': 0,
+            'send_receive_timeout': connection_params.get('send_receive_timeout', 300)
+        }
+
         logger.info(f"Connecting to ClickHouse at {host}:{port}")
         try:
-            self.client = clickhouse_connect.get_client(
-                host=host,
-                port=port,
-                username=username,
-                password=password,
-                database=database,
-                secure=secure
-            )
-            # Test connection
+            self.client = clickhouse_connect.get_client(**self._connection_params)
+            # Prime the keep-alive pool so the first benchmark query does
+            # not pay the TCP+TLS handshake, then test the connection
+            self.client.ping()
             self.client.command("SELECT 1")
             logger.info("ClickHouse connection established successfully")
             self.connected = True
@@ -73,33 +171,205 @@ class ClickHouseBenchmark(BenchmarkRunner):
         if limit_str.isdigit():
             return int(limit_str)
             
-        # Parse number with unit
-        match = re.match(r'^(\d+(\.\d+)?)\s*([KMGTkmgt]?[Bb]?)$', limit_str)
-        if not match:
+        # Parse number with unit: strip the optional trailing 'B', then
+        # look up the single-character unit prefix
+        value = limit_str.rstrip('Bb').rstrip()
+        unit = ''
+        if value and value[-1].upper() in _UNIT_MULT:
+            unit = value[-1].upper()
+            value = value[:-1].rstrip()
+
+        try:
+            # Convert to float first to handle decimal values
+            return int(float(value) * _UNIT_MULT[unit])
+        except ValueError:
             logger.warning(f"Invalid memory limit format: {limit_str}. Using default.")
             return 0
-            
-        value, _, unit = match.groups()
-        
-        # Convert to float first to handle decimal values
-        value = float(value)
-        
-        # Normalize unit to uppercase
-        unit = unit.upper()
-        
-        # Convert to bytes based on unit
-        if unit in ('K', 'KB'):
-            value *= 1024
-        elif unit in ('M', 'MB'):
-            value *= 1024 * 1024
-        elif unit in ('G', 'GB'):
-            value *= 1024 * 1024 * 1024
-        elif unit in ('T', 'TB'):
-            value *= 1024 * 1024 * 1024 * 1024
-            
-        # Return as integer
-        return int(value)
-    
+
+    def _next_host_params(self, exclude: tuple = ()) -> Dict[str, Any]:
+        """
+        Connection parameters for the next client, rotating the host
+        round-robin across the configured endpoints when alt_hosts were
+        given. Keys named in exclude are dropped from the copy.
+        """
+        params = self._connection_params
+        if len(self._hosts) > 1:
+            params = dict(params)
+            params['host'] = self._hosts[next(self._host_counter) % len(self._hosts)]
+        if exclude:
+            params = {k: v for k, v in params.items() if k not in exclude}
+        return params
+
+    def _get_thread_client(self) -> Client:
+        """Get (or lazily create) a dedicated client for the current thread."""
+        client = getattr(self._thread_clients, 'client', None)
+        if client is None:
+            # Profiling settings travel per-query via settings=, so no
+            # session setup is needed on the new connection
+            client = clickhouse_connect.get_client(**self._next_host_params())
+            self._thread_clients.client = client
+        return client
+
+    def _execute_single_run(self, benchmark, run: int, memory_limit=None,
+                            client: Optional[Client] = None,
+                            drop_caches: bool = False,
+                            warmup: bool = False) -> Dict[str, Any]:
+        """
+        Execute one run of a benchmark query and return its execution data.
+
+        Args:
+            benchmark: The QueryBenchmark to execute
+            run: Zero-based run index
+            memory_limit: Optional memory limit for this benchmark
+            client: Client to use; defaults to a per-thread client so this
+                    method is safe to call from a ThreadPoolExecutor
+            drop_caches: Drop the mark and uncompressed caches before the
+                         query (only meaningful in sequential mode; the
+                         caches are server-global)
+            warmup: Whether this is a warm-up run (affects the result
+                    cache policy)
+        """
+        if client is None:
+            client = self._get_thread_client()
+
+        name = benchmark.name
+        query = benchmark.query
+
+        if drop_caches:
+            client.command("SYSTEM DROP MARK CACHE")
+            client.command("SYSTEM DROP UNCOMPRESSED CACHE")
+
+        logger.info("Executing benchmark: %s (Run %d/%d)", name, run + 1, benchmark.run_count)
+
+        settings, query_id = self._build_run_settings(name, memory_limit, run, warmup)
+
+        # Monotonic, nanosecond-resolution timer; immune to wall-clock
+        # adjustments that time.time() is subject to
+        start_ns = time.perf_counter_ns()
+        try:
+            # Run the query with timing. raw_query drains the response off
+            # the wire without decoding rows into Python objects, so the
+            # measurement reflects server+network cost rather than
+            # client-side list construction; result_rows comes from the
+            # query_log instead.
+            # Queries carrying their own FORMAT clause (e.g. FORMAT Null
+            # benchmarks) must not get another one appended
+            fmt = None if _FORMAT_CLAUSE_RE.search(query) else 'Native'
+            client.raw_query(query, settings=settings, fmt=fmt)
+            execution_time = (time.perf_counter_ns() - start_ns) * 1e-9
+
+            logger.info("Query executed in %.4f seconds, ID: %s", execution_time, query_id)
+
+            execution_data = {
+                "benchmark_name": name,
+                "query": query,
+                "query_id": query_id,
+                "execution_time": execution_time,
+                "rows_returned": 0,
+                "run": run
+            }
+
+            return execution_data
+        except Exception as e:
+            execution_time = (time.perf_counter_ns() - start_ns) * 1e-9
+            return self._error_exec_data(name, query, query_id, execution_time, run, str(e))
+
+    @staticmethod
+    def _validate_result_cache(result_cache: Optional[str]) -> str:
+        """Normalize and validate a result_cache argument."""
+        policy = result_cache or 'off'
+        if policy not in ('off', 'on', 'second-onward'):
+            raise ValueError(
+                f"Unknown result_cache '{result_cache}'; "
+                "expected 'off', 'on' or 'second-onward'"
+            )
+        return policy
+
+    def _build_run_settings(self, name: str, memory_limit,
+                            run: int = 0, warmup: bool = False) -> tuple:
+        """
+        Build the per-query settings dict (profiling flags, optional memory
+        limit, client-side query_id) for one benchmark run.
+
+        Shipping the settings inline with the query avoids separate SET
+        round-trips, and their per-query scope means no reset command and
+        no state leaking between runs. The query_id is assigned client-side
+        so stats can be looked up even if the request fails mid-flight.
+        """
+        settings: Dict[str, Any] = {"log_queries": 1, "log_query_threads": 1}
+        # Suite-wide server settings (e.g. max_threads sweeps) come first so
+        # per-run values below still win on conflict
+        settings.update(self.server_settings)
+
+        if self.result_cache_policy == 'on':
+            settings["use_query_cache"] = 1
+        elif self.result_cache_policy == 'second-onward':
+            if warmup:
+                settings["use_query_cache"] = 0
+            elif run == 0:
+                # Populate the cache without reading it, so the first
+                # measured run still pays the cold path
+                settings.update({"use_query_cache": 1,
+                                 "enable_reads_from_query_cache": 0,
+                                 "enable_writes_to_query_cache": 1})
+            else:
+                settings.update({"use_query_cache": 1,
+                                 "enable_reads_from_query_cache": 1,
+                                 "enable_writes_to_query_cache": 0})
+
+        if memory_limit:
+            logger.info(f"Setting memory limit for {name}: {memory_limit}")
+            try:
+                # If it's already a number (bytes), use it directly
+                settings["max_memory_usage"] = int(memory_limit)
+            except ValueError:
+                # If it's a string with unit (like "9GB"), parse it
+                settings["max_memory_usage"] = self._parse_memory_limit(memory_limit)
+
+        query_id = str(uuid.uuid4())
+        settings["query_id"] = query_id
+        return settings, query_id
+
+    def _error_exec_data(self, name: str, query: str, query_id: str,
+                         execution_time: float, run: int, error_msg: str) -> Dict[str, Any]:
+        """Classify a failed run's error message into an execution-data entry."""
+        # Analyze the error type more specifically
+        if "MEMORY_LIMIT_EXCEEDED" in error_msg:
+            error_type = "MEMORY_LIMIT_EXCEEDED"
+
+            # Extract memory limit details in a single pass
+            memory_details = {}
+            for m in _MEM_DETAILS_RE.finditer(error_msg):
+                for group, key in _MEM_DETAIL_KEYS.items():
+                    value = m.group(group)
+                    if value:
+                        memory_details[key] = value
+
+            logger.error(f"Memory limit exceeded: {memory_details}")
+            error_details = memory_details
+        else:
+            error_type = "ERROR"
+            # Try to extract any error code information
+            code_match = _ERROR_CODE_RE.search(error_msg)
+            if code_match:
+                error_details = {"error_code": code_match.group(1)}
+            else:
+                error_details = {}
+
+        logger.error(f"Query failed: {error_type} - {error_msg}")
+
+        return {
+            "benchmark_name": name,
+            "query": query,
+            "query_id": query_id,
+            "execution_time": execution_time,
+            "rows_returned": 0,
+            "run": run,
+            "error": error_type,
+            "error_message": error_msg,
+            "error_details": error_details
+        }
+
     def _run_benchmark_queries(self, benchmarks, memory_limits=None) -> List[Dict[str, Any]]:
         """
         Run all benchmark queries in sequence first, save their query IDs,
@@ -118,127 +388,82 @@ class ClickHouseBenchmark(BenchmarkRunner):
         if memory_limits is None:
             memory_limits = {}
             
-        # First, execute all the queries and collect their query IDs
-        query_execution_data = []
-        
-        # Execute a query to reset query cache
-        self.client.command("SYSTEM DROP MARK CACHE")
-        self.client.command("SYSTEM DROP UNCOMPRESSED CACHE")
-        
-        # Set up profiling
-        self.client.command("SET log_queries=1")
-        self.client.command("SET log_query_threads=1")
-        
-        logger.info("Executing all benchmark queries and collecting query IDs...")
-        
+        # Build the full list of (benchmark, run, memory_limit, is_warmup)
+        # to execute; warmup runs precede the measured runs per benchmark
+        run_specs = []
         for benchmark in benchmarks:
-            name = benchmark.name
-            query = benchmark.query
-            
-            # Check if this benchmark has a specific memory limit
-            memory_limit = memory_limits.get(name)
-            
+            memory_limit = memory_limits.get(benchmark.name)
+            for run in range(benchmark.warmup_runs):
+                run_specs.append((benchmark, run, memory_limit, True))
             for run in range(benchmark.run_count):
-                logger.info(f"Executing benchmark: {name} (Run {run+1}/{benchmark.run_count})")
-                
-                try:
-                    # Apply memory limit if specified for this benchmark
-                    if memory_limit:
-                        logger.info(f"Setting memory limit for {name}: {memory_limit}")
-                        # Format the memory limit properly for ClickHouse
-                        # First check if it's already a number
-                        try:
-                            # If it's already a number (bytes), use it directly
-                            bytes_value = int(memory_limit)
-                            self.client.command(f"SET max_memory_usage = {bytes_value}")
-                        except ValueError:
-                            # If it's a string with unit (like "9GB"), parse it
-                            memory_limit_parsed = self._parse_memory_limit(memory_limit)
-                            self.client.command(f"SET max_memory_usage = {memory_limit_parsed}")
-                    
-                    # Run the query with timing
-                    start_time = time.time()
-                    result = self.client.query(query)
-                    execution_time = time.time() - start_time
-                    
-                    query_id = result.query_id
-                    rows_returned = len(result.result_rows)
-                    
-                    logger.info(f"Query executed in {execution_time:.4f} seconds, ID: {query_id}")
-                    
-                    query_execution_data.append({
-                        "benchmark_name": name,
-                        "query": query,
-                        "query_id": query_id,
-                        "execution_time": execution_time,
-                        "rows_returned": rows_returned,
-                        "run": run
-                    })
-                    
-                    # Reset memory limit if we set one
-                    if memory_limit:
-                        self.client.command("SET max_memory_usage = 0")  # Reset to default
-                except Exception as e:
-                    execution_time = time.time() - start_time
-                    error_msg = str(e)
-                    
-                    # Analyze the error type more specifically
-                    if "MEMORY_LIMIT_EXCEEDED" in error_msg:
-                        error_type = "MEMORY_LIMIT_EXCEEDED"
-                        
-                        # Extract memory limit details if possible
-                        memory_details = {}
-                        
-                        # Try to extract requested memory
-                        would_use_match = re.search(r'would use ([\d\.]+) ([KMGTPiB]+)', error_msg)
-                        if would_use_match:
-                            memory_details["requested_memory"] = f"{would_use_match.group(1)} {would_use_match.group(2)}"
-                        
-                        # Try to extract current RSS
-                        current_rss_match = re.search(r'current RSS ([\d\.]+) ([KMGTPiB]+)', error_msg)
-                        if current_rss_match:
-                            memory_details["current_rss"] = f"{current_rss_match.group(1)} {current_rss_match.group(2)}"
-                        
-                        # Try to extract maximum memory
-                        max_memory_match = re.search(r'maximum: ([\d\.]+) ([KMGTPiB]+)', error_msg)
-                        if max_memory_match:
-                            memory_details["maximum_memory"] = f"{max_memory_match.group(1)} {max_memory_match.group(2)}"
-                        
-                        logger.error(f"Memory limit exceeded: {memory_details}")
-                        
-                        # Add the memory details to the error message
-                        error_details = memory_details
+                run_specs.append((benchmark, run, memory_limit, False))
+
+        logger.info("Executing all benchmark queries and collecting query IDs...")
+
+        # First, execute all the queries and collect their query IDs
+        query_execution_data = []
+
+        if self.max_parallel > 1:
+            # Parallel mode: each worker uses its own client (set up with
+            # profiling in _get_thread_client). Global cache drops are
+            # skipped here because they would invalidate other in-flight
+            # queries mid-benchmark.
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                futures = [
+                    (executor.submit(self._execute_single_run, benchmark, run, memory_limit,
+                                     warmup=is_warmup),
+                     benchmark, is_warmup)
+                    for benchmark, run, memory_limit, is_warmup in run_specs
+                ]
+                for future, benchmark, is_warmup in futures:
+                    exec_data = future.result()
+                    if is_warmup:
+                        benchmark.warmup_results.append(exec_data)
                     else:
-                        error_type = "ERROR"
-                        # Try to extract any error code information
-                        code_match = re.search(r'error code (\d+)', error_msg)
-                        if code_match:
-                            error_details = {"error_code": code_match.group(1)}
-                        else:
-                            error_details = {}
-                    
-                    logger.error(f"Query failed: {error_type} - {error_msg}")
-                    
-                    # Add error entry with enhanced details
-                    query_execution_data.append({
-                        "benchmark_name": name,
-                        "query": query,
-                        "query_id": None,
-                        "execution_time": execution_time,
-                        "rows_returned": 0,
-                        "run": run,
-                        "error": error_type,
-                        "error_message": error_msg,
-                        "error_details": error_details
-                    })
-                
-                # Brief pause between queries
-                time.sleep(1)
-                
-        # Allow some time for query log to be updated
-        logger.info("Waiting for query log to be updated...")
-        time.sleep(10)
+                        query_execution_data.append(exec_data)
+        else:
+            for benchmark, run, memory_limit, is_warmup in run_specs:
+                # Drop caches per the benchmark's cache policy: before every
+                # run, or only before the first measured run for a cold-cache
+                # measurement. The default leaves caches warm so repeated
+                # runs measure steady-state variance.
+                drop_caches = benchmark.drop_caches_each_run or (
+                    benchmark.cold_cache and run == 0 and not is_warmup
+                )
+                exec_data = self._execute_single_run(
+                    benchmark, run, memory_limit, client=self.client,
+                    drop_caches=drop_caches, warmup=is_warmup
+                )
+                if is_warmup:
+                    # Keep warmup timings separate from the measured results
+                    benchmark.warmup_results.append(exec_data)
+                else:
+                    query_execution_data.append(exec_data)
+
+        return self._collect_results(query_execution_data)
+
+    def _collect_results(self, query_execution_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Flush the query logs, fetch stats for all executed queries in one
+        batch, and turn the raw execution data into result dicts.
+        """
+        # Force the query log buffers to flush so stats are readable immediately
+        logger.info("Flushing query logs...")
+        try:
+            self.client.command("SYSTEM FLUSH LOGS")
+        except Exception as e:
+            # Some managed deployments deny SYSTEM commands; fall back to a
+            # short wait and let the batch retry loop absorb the rest
+            logger.warning(f"SYSTEM FLUSH LOGS failed ({e}); waiting for the log flush interval")
+            time.sleep(2)
         
+        # Fetch stats for all successful queries in one query_log scan
+        query_ids = [
+            d["query_id"] for d in query_execution_data
+            if d.get("query_id") and not d.get("error")
+        ]
+        stats_by_id = self._get_query_stats_batch(query_ids)
+
         # Now process all the query logs to get the statistics
         results = []
         for exec_data in query_execution_data:
@@ -270,7 +495,7 @@ class ClickHouseBenchmark(BenchmarkRunner):
                             "Reduce the number of columns in SELECT"
                         ]
                 
-                result = BenchmarkResult(
+                result = make_result_dict(
                     query_name=exec_data["benchmark_name"],
                     execution_time=exec_data["execution_time"],
                     memory_usage=0,
@@ -279,12 +504,15 @@ class ClickHouseBenchmark(BenchmarkRunner):
                     rows_returned=0,
                     query=exec_data["query"],
                     additional_metrics=additional_metrics
-                ).__dict__
+                )
                 results.append(result)
                 continue
                 
-            # Get query stats for successful queries
-            stats = self._get_query_stats(exec_data["query_id"])
+            # Get query stats for successful queries; if the batch missed
+            # this id, poll the query_log for it individually
+            stats = stats_by_id.get(exec_data["query_id"])
+            if stats is None:
+                stats = self._get_query_stats(exec_data["query_id"])
             
             if stats:
                 # Get the stats values, ensuring we handle None values
@@ -296,17 +524,25 @@ class ClickHouseBenchmark(BenchmarkRunner):
                 result_rows = int(stats.get("result_rows") or exec_data["rows_returned"] or 0)
                 result_bytes = int(stats.get("result_bytes") or 0)
                 
-                logger.info(f"Stats for query {exec_data['query_id']}:")
-                logger.info(f"Memory usage: {self._format_bytes(memory_usage)}")
-                logger.info(f"Rows read: {rows_read:,}")
-                logger.info(f"Data read: {self._format_bytes(bytes_read)}")
-                logger.info(f"Rows written: {written_rows:,}")
-                logger.info(f"Data written: {self._format_bytes(written_bytes)}")
-                logger.info(f"Result rows: {result_rows:,}")
-                logger.info(f"Result bytes: {self._format_bytes(result_bytes)}")
+                # Lazy %-formatting is not enough here because the
+                # _format_bytes arguments are themselves computed, so skip
+                # the whole block when INFO is off
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        "Stats for query %s: memory %s, rows read %s, data read %s, "
+                        "rows written %s, data written %s, result rows %s, result bytes %s",
+                        exec_data['query_id'],
+                        self._format_bytes(memory_usage),
+                        f"{rows_read:,}",
+                        self._format_bytes(bytes_read),
+                        f"{written_rows:,}",
+                        self._format_bytes(written_bytes),
+                        f"{result_rows:,}",
+                        self._format_bytes(result_bytes)
+                    )
                 
                 # Create benchmark result
-                result = BenchmarkResult(
+                result = make_result_dict(
                     query_name=exec_data["benchmark_name"],
                     execution_time=exec_data["execution_time"],
                     memory_usage=memory_usage,
@@ -317,13 +553,19 @@ class ClickHouseBenchmark(BenchmarkRunner):
                     additional_metrics={
                         "written_rows": written_rows,
                         "written_bytes": written_bytes,
-                        "result_bytes": result_bytes
+                        "result_bytes": result_bytes,
+                        # Server-side duration in seconds, free of client
+                        # TLS/network jitter baked into execution_time
+                        "server_duration": float(stats.get("query_duration_ms") or 0),
+                        # Non-zero when the run was answered from the
+                        # server query result cache (see result_cache)
+                        "query_cache_hits": int(stats.get("query_cache_hits") or 0)
                     }
-                ).__dict__
+                )
             else:
                 # Fallback if stats not available
                 logger.warning(f"Could not get stats for query ID: {exec_data['query_id']}")
-                result = BenchmarkResult(
+                result = make_result_dict(
                     query_name=exec_data["benchmark_name"],
                     execution_time=exec_data["execution_time"],
                     memory_usage=0,
@@ -337,12 +579,109 @@ class ClickHouseBenchmark(BenchmarkRunner):
                         "result_bytes": 0,
                         "warning": "Query stats not available"
                     }
-                ).__dict__
+                )
                 
             results.append(result)
             
         return results
         
+    def _get_query_stats_batch(self, query_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get statistics for many query_ids in a single system.query_log scan.
+
+        Returns a dict keyed by query_id; ids whose log entry is not yet
+        available are simply absent, so callers can fall back to the
+        per-id lookup for them.
+        """
+        if not query_ids:
+            return {}
+
+        stats_by_id: Dict[str, Dict[str, Any]] = {}
+        remaining = list(query_ids)
+
+        # The logs are flushed beforehand so the first pass resolves
+        # everything in practice; two 1s retries remain as a safety net for
+        # ids still missing
+        for delay in (0, 1.0, 1.0):
+            if delay:
+                logger.debug("Waiting %.1fs for %d missing query_log entries", delay, len(remaining))
+                time.sleep(delay)
+
+            batch_query = """
+            SELECT
+                query_id,
+                type,
+                memory_usage,
+                read_rows,
+                read_bytes,
+                written_rows,
+                written_bytes,
+                result_rows,
+                result_bytes,
+                exception,
+                exception_code,
+                query_duration_ms,
+                query,
+                ProfileEvents['QueryCacheHits']
+            FROM system.query_log
+            WHERE query_id IN {qids:Array(String)}
+              AND type IN ('QueryFinish', 'ExceptionWhileProcessing')
+            """
+
+            try:
+                rows = self.client.query(batch_query,
+                                         parameters={'qids': remaining}).result_rows
+            except Exception as e:
+                logger.warning(f"Batch stats query failed: {e}")
+                return stats_by_id
+
+            self._merge_batch_stats(stats_by_id, rows)
+
+            remaining = [qid for qid in remaining if qid not in stats_by_id]
+            if not remaining:
+                break
+
+        if remaining:
+            logger.warning("No query_log entries found for %d query ids", len(remaining))
+
+        return stats_by_id
+
+    def _merge_batch_stats(self, stats_by_id: Dict[str, Dict[str, Any]], rows) -> None:
+        """Index raw query_log rows from the batch query into stats_by_id."""
+        for row in rows:
+            query_id = row[0]
+            row_type = str(row[1])
+
+            if row_type == 'QueryFinish':
+                stats_by_id[query_id] = {
+                    "memory_usage": row[2],
+                    "read_rows": row[3],
+                    "read_bytes": row[4],
+                    "written_rows": row[5],
+                    "written_bytes": row[6],
+                    "result_rows": row[7],
+                    "result_bytes": row[8],
+                    "query_duration_ms": row[11] / 1000.0,  # Convert to seconds
+                    "query": row[12],
+                    "query_cache_hits": row[13]
+                }
+            elif query_id not in stats_by_id:
+                # Exception entry; only used when no QueryFinish row exists
+                stats_by_id[query_id] = {
+                    "exception": row[9],
+                    "exception_code": row[10],
+                    "query_duration_ms": row[11] / 1000.0,  # Convert to seconds
+                    "memory_usage": row[2] or 0,
+                    "read_rows": 0,
+                    "read_bytes": 0,
+                    "written_rows": 0,
+                    "written_bytes": 0,
+                    "result_rows": 0,
+                    "result_bytes": 0,
+                    "query": row[12],
+                    "failed": True
+                }
+
     def _get_query_stats(self, query_id: str) -> Dict[str, Any]:
         """
         Get query statistics from system.query_log for a specific query_id.
@@ -352,9 +691,12 @@ class ClickHouseBenchmark(BenchmarkRunner):
         if not query_id:
             return {}
             
-        # Define the query to get the statistics from successful queries
-        stats_query = f"""
-        SELECT 
+        # Define the query to get the statistics from successful queries.
+        # Server-side parameter binding keeps the SQL text constant across
+        # poll attempts (one parse/analyze on the server) and avoids
+        # interpolating the query_id into the string.
+        stats_query = """
+        SELECT
             memory_usage,
             read_rows,
             read_bytes,
@@ -362,15 +704,17 @@ class ClickHouseBenchmark(BenchmarkRunner):
             written_bytes,
             result_rows,
             result_bytes,
-            query
+            query_duration_ms,
+            query,
+            ProfileEvents['QueryCacheHits']
         FROM system.query_log
-        WHERE query_id = '{query_id}' AND type = 'QueryFinish'
+        WHERE query_id = {qid:String} AND type = 'QueryFinish'
         LIMIT 1
         """
-        
+
         # Also define a query to check for exceptions (for failed queries)
-        exception_query = f"""
-        SELECT 
+        exception_query = """
+        SELECT
             exception,
             exception_code,
             initial_query_start_time,
@@ -378,18 +722,20 @@ class ClickHouseBenchmark(BenchmarkRunner):
             peak_memory_usage,
             query
         FROM system.query_log
-        WHERE query_id = '{query_id}' AND exception != ''
+        WHERE query_id = {qid:String} AND exception != ''
         LIMIT 1
         """
         
-        # Try to get query stats with retries
-        max_attempts = 15
+        # The logs are flushed before this is called, so the first attempt
+        # almost always succeeds; two 1s retries remain as a safety net.
+        poll_delays = (1.0, 1.0)
+        max_attempts = len(poll_delays) + 1
         stats = {}
-        
+
         for attempt in range(max_attempts):
             try:
                 # First check for normal query finish
-                stats_result = self.client.query(stats_query)
+                stats_result = self.client.query(stats_query, parameters={'qid': query_id})
                 if stats_result.result_rows:
                     row = stats_result.result_rows[0]
                     
@@ -402,14 +748,16 @@ class ClickHouseBenchmark(BenchmarkRunner):
                         "written_bytes": row[4],
                         "result_rows": row[5],
                         "result_bytes": row[6],
-                        "query": row[7]
+                        "query_duration_ms": row[7] / 1000.0,  # Convert to seconds
+                        "query": row[8],
+                        "query_cache_hits": row[9]
                     }
                     
                     logger.debug(f"Got query stats on attempt {attempt + 1}")
                     break
                 
                 # If no normal finish, check for exceptions
-                exception_result = self.client.query(exception_query)
+                exception_result = self.client.query(exception_query, parameters={'qid': query_id})
                 if exception_result.result_rows:
                     row = exception_result.result_rows[0]
                     
@@ -434,13 +782,13 @@ class ClickHouseBenchmark(BenchmarkRunner):
                     break
                     
                 if attempt < max_attempts - 1:
-                    delay = (attempt + 1) * 0.5  # Increasing delay
+                    delay = poll_delays[attempt]
                     logger.debug(f"No stats yet for query ID {query_id}, retrying in {delay}s (attempt {attempt + 1}/{max_attempts})")
                     time.sleep(delay)
             except Exception as e:
                 logger.warning(f"Failed to get query stats for ID {query_id}: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep((attempt + 1) * 0.5)
+                    time.sleep(poll_delays[attempt])
         
         return stats
     
@@ -466,7 +814,7 @@ class ClickHouseBenchmark(BenchmarkRunner):
             return results[0]
         else:
             # Create a basic error result if something went wrong
-            return BenchmarkResult(
+            return make_result_dict(
                 query_name=name,
                 execution_time=0,
                 memory_usage=0,
@@ -475,42 +823,180 @@ class ClickHouseBenchmark(BenchmarkRunner):
                 rows_returned=0,
                 query=query,
                 additional_metrics={"error": "Failed to execute query"}
-            ).__dict__
+            )
     
-    def run_all_benchmarks(self, memory_limits=None, skip_benchmarks=None):
+    def run_all_benchmarks(self, memory_limits=None, skip_benchmarks=None,
+                           cache_policy: Optional[str] = None,
+                           server_settings: Optional[Dict[str, Any]] = None,
+                           result_cache: Optional[str] = None):
         """
         Run all benchmark queries using the batch approach.
-        
+
         Args:
             memory_limits: Optional dict mapping benchmark names to memory limits
                            e.g. {"complex_join_test": "4294967296"} (4GB in bytes)
-            skip_benchmarks: Optional list of benchmark names to skip
+            skip_benchmarks: Optional collection of benchmark names to skip
+            cache_policy: Optional suite-wide cache behaviour overriding the
+                          per-benchmark flags:
+                          - 'cold-every-run': drop server caches before every run
+                          - 'cold-first-only': drop caches before the first
+                            measured run of each benchmark
+                          - 'warm': discard at least one warm-up run per
+                            benchmark before measuring
+            server_settings: Optional dict of ClickHouse settings (e.g.
+                             {'max_threads': 8}) applied to every run,
+                             for parallelism sweeps without code changes
+            result_cache: Server query result cache policy: 'off'
+                          (default), 'on' for every run, or
+                          'second-onward' where the first measured run
+                          populates the cache cold and later runs read it
         """
         if not self.connected:
             logger.error("Not connected to database. Call connect() first.")
             return None
-        
+
         logger.info(f"Starting {self.db_name} benchmark run...")
-        
-        # Filter benchmarks if skip_benchmarks is provided
-        benchmarks_to_run = self.benchmarks
-        if skip_benchmarks:
-            benchmarks_to_run = [b for b in self.benchmarks if b.name not in skip_benchmarks]
-            logger.info(f"Skipping benchmarks: {skip_benchmarks}")
-        
+
+        self.server_settings = server_settings or {}
+        self.result_cache_policy = self._validate_result_cache(result_cache)
+        benchmarks_to_run = self._select_benchmarks(skip_benchmarks, cache_policy)
+
         # Use the new batch approach with memory limits
         all_results = self._run_benchmark_queries(benchmarks_to_run, memory_limits)
-        
-        # Organize results by benchmark
-        for result in all_results:
-            benchmark_name = result["query_name"]
-            for benchmark in self.benchmarks:
-                if benchmark.name == benchmark_name:
-                    benchmark.results.append(result)
-                    break
-        
+
+        self._attach_results(all_results)
+
         logger.info("All benchmarks completed")
         return self.format_results()
+
+    async def run_all_benchmarks_async(self, memory_limits=None, skip_benchmarks=None,
+                                       concurrency: int = 4,
+                                       cache_policy: Optional[str] = None,
+                                       server_settings: Optional[Dict[str, Any]] = None,
+                                       result_cache: Optional[str] = None):
+        """
+        Async variant of run_all_benchmarks that overlaps distinct
+        benchmarks up to `concurrency` at a time. Runs of a single
+        benchmark stay sequential so its timings remain comparable; cache
+        drops are skipped because the caches are server-global. Requires
+        the clickhouse-connect async extra (aiohttp).
+
+        Args:
+            memory_limits: Optional dict mapping benchmark names to memory limits
+            skip_benchmarks: Optional collection of benchmark names to skip
+            concurrency: Maximum number of benchmarks in flight at once
+            cache_policy: Only 'warm' is meaningful here; the cold policies
+                          require exclusive use of the server caches
+            server_settings: Optional dict of ClickHouse settings applied
+                             to every run
+            result_cache: Server query result cache policy ('off', 'on'
+                          or 'second-onward'), as in run_all_benchmarks
+        """
+        if not self.connected:
+            logger.error("Not connected to database. Call connect() first.")
+            return None
+
+        logger.info(f"Starting {self.db_name} async benchmark run (concurrency={concurrency})...")
+
+        self.server_settings = server_settings or {}
+        self.result_cache_policy = self._validate_result_cache(result_cache)
+        benchmarks_to_run = self._select_benchmarks(skip_benchmarks, cache_policy)
+        if memory_limits is None:
+            memory_limits = {}
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(benchmark) -> List[Dict[str, Any]]:
+            memory_limit = memory_limits.get(benchmark.name)
+            async with semaphore:
+                # One client per benchmark: the async client serializes on
+                # a single underlying connection, so sharing one would
+                # serialize the whole suite again. The host rotates across
+                # alt_hosts so replicas share the load; the async client
+                # does not take the urllib3 pool manager
+                client = await clickhouse_connect.get_async_client(
+                    **self._next_host_params(exclude=('pool_mgr',)))
+                try:
+                    measured = []
+                    for run in range(benchmark.warmup_runs):
+                        data = await self._execute_single_run_async(client, benchmark, run,
+                                                                    memory_limit, warmup=True)
+                        benchmark.warmup_results.append(data)
+                    for run in range(benchmark.run_count):
+                        measured.append(
+                            await self._execute_single_run_async(client, benchmark, run, memory_limit)
+                        )
+                    return measured
+                finally:
+                    await client.close()
+
+        per_benchmark = await asyncio.gather(*(run_one(b) for b in benchmarks_to_run))
+        query_execution_data = [d for runs in per_benchmark for d in runs]
+
+        all_results = self._collect_results(query_execution_data)
+        self._attach_results(all_results)
+
+        logger.info("All benchmarks completed")
+        return self.format_results()
+
+    async def _execute_single_run_async(self, client, benchmark, run: int,
+                                        memory_limit=None,
+                                        warmup: bool = False) -> Dict[str, Any]:
+        """Async counterpart of _execute_single_run for a shared event loop."""
+        name = benchmark.name
+        query = benchmark.query
+
+        logger.info("Executing benchmark: %s (Run %d/%d)", name, run + 1, benchmark.run_count)
+
+        settings, query_id = self._build_run_settings(name, memory_limit, run, warmup)
+
+        fmt = None if _FORMAT_CLAUSE_RE.search(query) else 'Native'
+        start_ns = time.perf_counter_ns()
+        try:
+            await client.raw_query(query, settings=settings, fmt=fmt)
+            execution_time = (time.perf_counter_ns() - start_ns) * 1e-9
+
+            logger.info("Query executed in %.4f seconds, ID: %s", execution_time, query_id)
+
+            return {
+                "benchmark_name": name,
+                "query": query,
+                "query_id": query_id,
+                "execution_time": execution_time,
+                "rows_returned": 0,
+                "run": run
+            }
+        except Exception as e:
+            execution_time = (time.perf_counter_ns() - start_ns) * 1e-9
+            return self._error_exec_data(name, query, query_id, execution_time, run, str(e))
+
+    def _select_benchmarks(self, skip_benchmarks=None,
+                           cache_policy: Optional[str] = None):
+        """Apply the skip list and cache policy, returning the benchmarks to run."""
+        benchmarks_to_run = self.benchmarks
+        if skip_benchmarks:
+            benchmarks_to_run = [b for b in self.benchmarks if b.name not in skip_benchmarks]
+            logger.info(f"Skipping benchmarks: {sorted(skip_benchmarks)}")
+
+        if cache_policy is not None:
+            if cache_policy not in ('cold-every-run', 'cold-first-only', 'warm'):
+                raise ValueError(f"Unknown cache_policy: {cache_policy}")
+            for b in benchmarks_to_run:
+                b.drop_caches_each_run = cache_policy == 'cold-every-run'
+                b.cold_cache = cache_policy == 'cold-first-only'
+                if cache_policy == 'warm':
+                    b.warmup_runs = max(b.warmup_runs, 1)
+
+        return benchmarks_to_run
+
+    def _attach_results(self, all_results: List[Dict[str, Any]]):
+        """Organize results by benchmark; dict lookup instead of an
+        O(results x benchmarks) list scan."""
+        by_name = {b.name: b for b in self.benchmarks}
+        for result in all_results:
+            benchmark = by_name.get(result["query_name"])
+            if benchmark is not None:
+                benchmark.results.append(result)
     
     def benchmark_table_info(self, database: Optional[str] = None) -> Dict[str, Any]:
         """Get information about tables in the database."""
@@ -518,61 +1004,67 @@ class ClickHouseBenchmark(BenchmarkRunner):
             logger.error("ClickHouse client not initialized. Call connect() first.")
             return {}
         
-        if database:
-            query = f"SHOW TABLES FROM {database}"
-        else:
-            query = "SHOW TABLES"
-            
-        tables = self.client.query(query).result_rows
+        db = database or self.client.database or 'default'
+
+        size_rows = self.client.query(_TABLE_SIZE_QUERY, parameters={'db': db}).result_rows
+        column_rows = self.client.query(_TABLE_COLUMNS_QUERY, parameters={'db': db}).result_rows
+
+        return self._build_table_info(size_rows, column_rows)
+
+    async def benchmark_table_info_async(self, database: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async variant of benchmark_table_info that issues the size and
+        structure queries concurrently, overlapping their round-trips.
+        Requires the clickhouse-connect async extra (aiohttp).
+        """
+        if not self._connection_params:
+            logger.error("ClickHouse connection not configured. Call connect() first.")
+            return {}
+
+        db = database or self._connection_params.get('database') or 'default'
+
+        # The async client does not take the urllib3 pool manager
+        params = {k: v for k, v in self._connection_params.items() if k != 'pool_mgr'}
+        client = await clickhouse_connect.get_async_client(**params)
+        try:
+            size_result, columns_result = await asyncio.gather(
+                client.query(_TABLE_SIZE_QUERY, parameters={'db': db}),
+                client.query(_TABLE_COLUMNS_QUERY, parameters={'db': db})
+            )
+        finally:
+            await client.close()
+
+        return self._build_table_info(size_result.result_rows, columns_result.result_rows)
+
+    def _build_table_info(self, size_rows, column_rows) -> Dict[str, Any]:
+        """Assemble the per-table info dict from the bulk query results."""
+        sizes = {row[0]: row[1:] for row in size_rows}
+
+        # system.columns covers every table (including ones without parts),
+        # so it drives which tables appear in the result
         table_info = {}
-        
-        for table_row in tables:
-            table_name = table_row[0]
-            
-            # Get table size
-            size_query = f"""
-            SELECT 
-                sum(bytes) as size_bytes,
-                sum(rows) as total_rows,
-                min(modification_time) as creation_time,
-                max(modification_time) as last_modified
-            FROM system.parts
-            WHERE table = '{table_name}' AND active = 1
-            """
-            
-            size_result = self.client.query(size_query).result_rows
-            
-            # Get table structure
-            structure_query = f"DESCRIBE TABLE {table_name}"
-            structure_result = self.client.query(structure_query).result_rows
-            
-            columns = []
-            for col in structure_result:
-                columns.append({
-                    "name": col[0],
-                    "type": col[1],
-                    "default_type": col[3],
-                    "default_expression": col[4]
-                })
-            
-            if size_result:
-                size_bytes = size_result[0][0] or 0
-                total_rows = size_result[0][1] or 0
-                creation_time = size_result[0][2]
-                last_modified = size_result[0][3]
-            else:
-                size_bytes = 0
-                total_rows = 0
-                creation_time = None
-                last_modified = None
-            
-            table_info[table_name] = {
-                "size_bytes": size_bytes,
-                "size_human": self._format_bytes(size_bytes),
-                "total_rows": total_rows,
-                "creation_time": creation_time,
-                "last_modified": last_modified,
-                "columns": columns
-            }
-        
-        return table_info
\ No newline at end of file
+        for table_name, col_name, col_type, default_kind, default_expression in column_rows:
+            info = table_info.get(table_name)
+            if info is None:
+                size_bytes, total_rows, creation_time, last_modified = sizes.get(
+                    table_name, (0, 0, None, None)
+                )
+                size_bytes = size_bytes or 0
+                total_rows = total_rows or 0
+                info = table_info[table_name] = {
+                    "size_bytes": size_bytes,
+                    "size_human": self._format_bytes(size_bytes),
+                    "total_rows": total_rows,
+                    "creation_time": creation_time,
+                    "last_modified": last_modified,
+                    "columns": []
+                }
+
+            info["columns"].append({
+                "name": col_name,
+                "type": col_type,
+                "default_type": default_kind,
+                "default_expression": default_expression
+            })
+
+        return table_info
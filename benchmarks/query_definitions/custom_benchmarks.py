@@ -2,7 +2,7 @@
 """
 Template for creating custom benchmark query collections.
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from .base import BenchmarkQueryCollection
 
@@ -26,15 +26,41 @@ class CustomBenchmarks(BenchmarkQueryCollection):
     def description(self) -> str:
         return self._description
     
-    def add_query(self, name: str, query: str, description: str = "", run_count: int = 3):
-        """Add a query to the collection."""
-        self._queries.append({
+    def add_query(self, name: str, query: str, description: str = "",
+                  run_count: Optional[int] = None, format_null: bool = False):
+        """
+        Add a query to the collection. format_null discards the result
+        server-side (FORMAT Null) so only execution cost is measured.
+        run_count is recorded only when given, so the runner's default
+        still applies to queries that did not ask for a specific count.
+        """
+        query_def = {
             "name": name,
             "query": query,
             "description": description,
-            "run_count": run_count
-        })
-    
+            "format_null": format_null
+        }
+        if run_count is not None:
+            query_def["run_count"] = run_count
+        self._queries.append(query_def)
+
+    def add_queries(self, query_defs: List[Dict[str, Any]], default_run_count: int = 3):
+        """
+        Add many query definitions in one pass. Missing fields get the
+        same defaults as add_query, and extra keys understood downstream
+        (e.g. format_null, warmup_runs) are carried through untouched.
+        """
+        self._queries.extend({
+            **d,
+            "name": d.get("name", "unnamed_query"),
+            "query": d.get("query", "SELECT 1"),
+            "description": d.get("description", ""),
+            "run_count": d.get("run_count", default_run_count)
+        } for d in query_defs)
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
     def get_queries(self) -> List[Dict[str, Any]]:
         """Return the list of benchmark queries."""
         return self._queries
\ No newline at end of file
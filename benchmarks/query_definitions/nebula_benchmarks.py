@@ -2,6 +2,8 @@
 """
 Benchmark queries for Nebula database tables.
 """
+from functools import cached_property
+from textwrap import dedent
 from typing import List, Dict, Any
 
 from .base import BenchmarkQueryCollection
@@ -9,7 +11,52 @@ from .base import BenchmarkQueryCollection
 
 class NebulaBenchmarks(BenchmarkQueryCollection):
     """Benchmark queries for Nebula database tables."""
-    
+
+    # Representative column subsets for the scan benchmarks. SELECT *
+    # forces every column file to be read, so the wide tables would mostly
+    # measure how many columns they have; a fixed projection keeps the
+    # scans comparable. The *_star variants keep full-row scans measurable.
+    _SCAN_COLUMNS = {
+        "crawls": "id, created_at, state, crawled_peers, dialable_peers, undialable_peers",
+        "visits": "visit_started_at, visit_ended_at, crawl_id, peer_id",
+        "neighbors": "crawl_id, peer_discovery_id_prefix, neighbor_discovery_id_prefix",
+    }
+
+    @staticmethod
+    def _cutoff_prefix(days: int) -> str:
+        """
+        WITH-clause prefix pinning a date cutoff as a literal constant so
+        partition pruning works from the literal instead of a per-row
+        today()/NOW() expression.
+        """
+        return f"WITH toDate(today()) - {days} AS cutoff "
+
+    # The visits time-range family is the cartesian product of these two
+    # axes; the entries are generated rather than hand-listed
+    _TIME_COLS = (("start", "visit_started_at"), ("end", "visit_ended_at"))
+    _TIME_FILTERS = (("last_day", 1), ("last_3days", 3))
+
+    def _visits_time_queries(self) -> List[Dict[str, Any]]:
+        """Generate the visits scan/count variants per time column and range."""
+        visits_cols = self._SCAN_COLUMNS["visits"]
+        queries = []
+        for col_suffix, col in self._TIME_COLS:
+            for range_suffix, days in self._TIME_FILTERS:
+                range_label = range_suffix.replace("last_", "Last ").replace("3days", "3 days")
+                prefix = self._cutoff_prefix(days)
+                queries.append({
+                    "name": f"visits_table_scan_{range_suffix}_{col_suffix}",
+                    "description": f"{range_label} table scan of the visits table, by {col}",
+                    "query": f"{prefix}SELECT {visits_cols} FROM nebula.visits WHERE {col} >= cutoff",
+                    "format_null": True
+                })
+                queries.append({
+                    "name": f"visits_count_{range_suffix}_{col_suffix}",
+                    "description": f"{range_label} Count of rows visits table, by {col}",
+                    "query": f"{prefix}SELECT COUNT(*) FROM nebula.visits WHERE {col} >= cutoff"
+                })
+        return queries
+
     @property
     def name(self) -> str:
         return "nebula_benchmarks"
@@ -18,139 +65,183 @@ class NebulaBenchmarks(BenchmarkQueryCollection):
     def description(self) -> str:
         return "Benchmark queries for Nebula database tables (crawls, visits, neighbors, etc.)"
     
-    def get_queries(self) -> List[Dict[str, Any]]:
-        """Return predefined benchmark queries for Nebula tables."""
-        return [
+    def get_queries(self, skip=None) -> List[Dict[str, Any]]:
+        """
+        Return predefined benchmark queries for Nebula tables.
+
+        Args:
+            skip: Optional collection of query names to leave out, so
+                  skipped benchmarks are never materialized downstream
+        """
+        if skip:
+            return [q for q in self._query_list if q["name"] not in skip]
+        return self._query_list
+
+    @cached_property
+    def _query_list(self) -> List[Dict[str, Any]]:
+        # Built once per instance; get_queries is called per harness run
+        # and the dicts do not change
+        crawls_cols = self._SCAN_COLUMNS["crawls"]
+        visits_cols = self._SCAN_COLUMNS["visits"]
+        neighbors_cols = self._SCAN_COLUMNS["neighbors"]
+        queries = [
             # Crawls table benchmarks
             {
                 "name": "crawls_table_scan_full",
-                "description": "Full table scan of the crawls table",
-                "query": "SELECT * FROM nebula.crawls"
+                "description": "Full table scan of the crawls table (projected columns)",
+                "query": f"SELECT {crawls_cols} FROM nebula.crawls",
+                "format_null": True
+            },
+            {
+                "name": "crawls_table_scan_full_star",
+                "description": "Full table scan of the crawls table, all columns",
+                "query": "SELECT * FROM nebula.crawls",
+                "format_null": True
             },
             {
                 "name": "crawls_table_scan_last_day",
                 "description": "Last day table scan of the crawls table",
-                "query": "SELECT * FROM nebula.crawls WHERE created_at >= today() - INTERVAL 1 DAY"
+                "query": f"{self._cutoff_prefix(1)}SELECT {crawls_cols} FROM nebula.crawls WHERE created_at >= cutoff",
+                "format_null": True
             },
             {
                 "name": "crawls_table_scan_last_3days",
                 "description": "Last 3 days table scan of the crawls table",
-                "query": "SELECT * FROM nebula.crawls WHERE created_at >= today() - INTERVAL 3 DAY"
+                "query": f"{self._cutoff_prefix(3)}SELECT {crawls_cols} FROM nebula.crawls WHERE created_at >= cutoff",
+                "format_null": True
             },
             {
                 "name": "crawls_count",
                 "description": "Count of rows in crawls table",
                 "query": "SELECT COUNT(*) FROM nebula.crawls"
             },
+            # Companion pair making the trivial-count optimization
+            # measurable: answered from part metadata vs a forced scan
+            {
+                "name": "crawls_count_trivial",
+                "description": "Count of crawls rows answered from part metadata",
+                "query": "SELECT COUNT(*) FROM nebula.crawls SETTINGS optimize_trivial_count_query = 1"
+            },
+            {
+                "name": "crawls_count_scan",
+                "description": "Count of crawls rows with the trivial count optimization disabled",
+                "query": "SELECT COUNT(*) FROM nebula.crawls SETTINGS optimize_trivial_count_query = 0"
+            },
             {
                 "name": "crawls_filter_by_state",
                 "description": "Filter crawls by state",
                 "query": "SELECT * FROM crawls WHERE state = 'succeeded'"
             },
+            {
+                "name": "crawls_filter_by_state_prewhere",
+                "description": "Filter crawls by state using PREWHERE",
+                "query": "SELECT * FROM crawls PREWHERE state = 'succeeded'"
+            },
             {
                 "name": "crawls_recent_stats",
                 "description": "Statistics from recent successful crawls",
+                # Group on toDate (fixed-width Date key) rather than
+                # formatDateTime, which runs a strftime formatter per row
+                # and hashes variable-length Strings in the aggregation;
+                # display formatting happens once per output day instead
                 "query": """
-                SELECT 
-                    formatDateTime(created_at, '%Y-%m-%d') as day,
+                SELECT
+                    formatDateTime(day, '%Y-%m-%d') as day,
+                    total_crawls,
+                    avg_crawled_peers,
+                    avg_dialable_peers,
+                    avg_undialable_peers
+                FROM (
+                    SELECT
+                        toDate(created_at) as day,
+                        COUNT(*) as total_crawls,
+                        AVG(crawled_peers) as avg_crawled_peers,
+                        AVG(dialable_peers) as avg_dialable_peers,
+                        AVG(undialable_peers) as avg_undialable_peers
+                    FROM nebula.crawls
+                    PREWHERE state = 'succeeded'
+                    WHERE created_at >= NOW() - INTERVAL 30 DAY
+                    GROUP BY day
+                    ORDER BY day DESC
+                )
+                """
+            },
+            # Same aggregation with in-order aggregation enabled, so the
+            # read-in-order path can be compared against hash aggregation
+            {
+                "name": "crawls_recent_stats_in_order",
+                "description": "Recent crawl statistics aggregated in key order",
+                "query": """
+                SELECT
+                    toDate(created_at) as day,
                     COUNT(*) as total_crawls,
                     AVG(crawled_peers) as avg_crawled_peers,
                     AVG(dialable_peers) as avg_dialable_peers,
                     AVG(undialable_peers) as avg_undialable_peers
                 FROM nebula.crawls
-                WHERE 
-                    state = 'succeeded' AND 
-                    created_at >= NOW() - INTERVAL 30 DAY
+                PREWHERE state = 'succeeded'
+                WHERE created_at >= NOW() - INTERVAL 30 DAY
                 GROUP BY day
                 ORDER BY day DESC
+                SETTINGS optimize_aggregation_in_order = 1
                 """
             },
             
             # Visits table benchmarks
             {
                 "name": "visits_table_scan_full",
-                "description": "Full table scan of the visits table",
-                "query": "SELECT * FROM nebula.visits"
+                "description": "Full table scan of the visits table (projected columns)",
+                "query": f"SELECT {visits_cols} FROM nebula.visits",
+                "format_null": True
             },
             {
-                "name": "visits_table_scan_last_day_start",
-                "description": "Last day table scan of the visits table, by visit_started_at",
-                "query": """
-                    SELECT * FROM nebula.visits 
-                    WHERE visit_started_at >= today() - INTERVAL 1 DAY 
-                    """
+                "name": "visits_table_scan_full_star",
+                "description": "Full table scan of the visits table, all columns",
+                "query": "SELECT * FROM nebula.visits",
+                "format_null": True
             },
+            # Requires a SAMPLE BY expression on the table (e.g.
+            # SAMPLE BY intHash64(peer_id)); reads ~10% of granules for
+            # proportional scan-throughput signal at a fraction of the IO
             {
-                "name": "visits_table_scan_last_3days_start",
-                "description": "Last 3 days table scan of the visits table, by visit_started_at",
-                "query": """
-                    SELECT * FROM nebula.visits 
-                    WHERE visit_started_at >= today() - INTERVAL 3 DAY 
-                    """
-            },
-            {
-                "name": "visits_table_scan_last_day_end",
-                "description": "Last day table scan of the visits table, by visit_ended_at",
-                "query": """
-                    SELECT * FROM nebula.visits 
-                    WHERE visit_ended_at >= today() - INTERVAL 1 DAY 
-                    """
+                "name": "visits_table_scan_sample01",
+                "description": "10% sampled scan of the visits table",
+                "query": f"SELECT {visits_cols} FROM nebula.visits SAMPLE 0.1",
+                "format_null": True
             },
+            # Bounded-cost fallback for tables without a sampling key
             {
-                "name": "visits_table_scan_last_3days_end",
-                "description": "Last 3 days table scan of the visits table, by visit_ended_at",
-                "query": """
-                    SELECT * FROM nebula.visits 
-                    WHERE visit_ended_at >= today() - INTERVAL 3 DAY 
-                    """
+                "name": "visits_table_scan_bounded",
+                "description": "Visits scan bounded to 1M rows read",
+                "query": f"""
+                SELECT {visits_cols} FROM nebula.visits
+                SETTINGS max_rows_to_read = 1000000, read_overflow_mode = 'break'
+                """,
+                "format_null": True
             },
+            *self._visits_time_queries(),
             {
                 "name": "visits_count_full",
                 "description": "Count of rows in visits table",
                 "query": "SELECT COUNT(*) FROM nebula.visits"
             },
 
-            {
-                "name": "visits_count_last_day_start",
-                "description": "Last day Count of rows visits table, by visit_started_at",
-                "query": """
-                    SELECT COUNT(*) FROM nebula.visits 
-                    WHERE visit_started_at >= today() - INTERVAL 1 DAY 
-                    """
-            },
-            {
-                "name": "visits_count_last_3days_start",
-                "description": "Last 3 days Count of rows visits table, by visit_started_at",
-                "query": """
-                    SELECT COUNT(*) FROM nebula.visits 
-                    WHERE visit_started_at >= today() - INTERVAL 3 DAY 
-                    """
-            },
-            {
-                "name": "visits_count_last_day_end",
-                "description": "Last day Count of rows visits table, by visit_ended_at",
-                "query": """
-                    SELECT COUNT(*) FROM nebula.visits 
-                    WHERE visit_ended_at >= today() - INTERVAL 1 DAY 
-                    """
-            },
-            {
-                "name": "visits_count_last_3days_end",
-                "description": "Last 3 days Count of rows visits table, by visit_ended_at",
-                "query": """
-                    SELECT COUNT(*) FROM nebula.visits 
-                    WHERE visit_ended_at >= today() - INTERVAL 3 DAY 
-                    """
-            },
             
 
             {
                 "name": "visits_filter_by_crawl_id",
                 "description": "Filter visits by crawl_id",
-                "query": """
-                SELECT * 
-                FROM nebula.visits 
-                WHERE crawl_id = (SELECT id FROM crawls ORDER BY created_at DESC LIMIT 1)
+                "query": f"""
+                WITH recent AS (
+                    SELECT id, created_at
+                    FROM nebula.crawls
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                )
+                SELECT {visits_cols}
+                FROM nebula.visits
+                PREWHERE crawl_id = (SELECT id FROM recent)
+                WHERE visit_started_at >= (SELECT created_at FROM recent) - INTERVAL 1 DAY
                 LIMIT 10000
                 """
             },
@@ -165,25 +256,56 @@ class NebulaBenchmarks(BenchmarkQueryCollection):
                     connect_maddr,
                     dial_errors
                 FROM nebula.visits
-                WHERE 
+                WHERE
                     visit_started_at >= NOW() - INTERVAL 1 DAY AND
                     length(dial_errors) = 0
                 ORDER BY visit_started_at DESC
                 LIMIT 10000
                 """
             },
+            {
+                "name": "visits_recent_with_filtering_prewhere",
+                "description": "Recent visits with filtering, dial_errors predicate in PREWHERE",
+                "query": """
+                SELECT
+                    visit_started_at,
+                    peer_id,
+                    agent_version,
+                    connect_maddr,
+                    dial_errors
+                FROM nebula.visits
+                PREWHERE length(dial_errors) = 0
+                WHERE visit_started_at >= NOW() - INTERVAL 1 DAY
+                ORDER BY visit_started_at DESC
+                LIMIT 10000
+                """
+            },
             {
                 "name": "visits_complex_json_extraction",
-                "description": "Complex JSON extraction and filtering",
+                "description": "Complex JSON extraction and filtering, typed extraction",
                 "query": """
-                SELECT 
+                SELECT
+                    visit_started_at,
+                    peer_id,
+                    JSONExtract(peer_properties, 'ip', 'Nullable(String)') AS ip
+                FROM nebula.visits
+                PREWHERE simpleJSONHas(peer_properties, 'ip')
+                WHERE visit_started_at >= NOW() - INTERVAL 7 DAY
+                ORDER BY visit_started_at DESC
+                LIMIT 10000
+                """
+            },
+            {
+                "name": "visits_simple_json_extraction",
+                "description": "Same extraction via simpleJSON functions (no full JSON parse)",
+                "query": """
+                SELECT
                     visit_started_at,
                     peer_id,
-                    JSONExtractString(toString(peer_properties), 'ip') AS ip
+                    simpleJSONExtractString(peer_properties, 'ip') AS ip
                 FROM nebula.visits
-                WHERE 
-                    visit_started_at >= NOW() - INTERVAL 7 DAY AND
-                    toString(peer_properties) LIKE '%ip%'
+                PREWHERE simpleJSONHas(peer_properties, 'ip')
+                WHERE visit_started_at >= NOW() - INTERVAL 7 DAY
                 ORDER BY visit_started_at DESC
                 LIMIT 10000
                 """
@@ -192,8 +314,15 @@ class NebulaBenchmarks(BenchmarkQueryCollection):
             # Neighbors table benchmarks
             {
                 "name": "neighbors_full_table_scan",
-                "description": "Full table scan of the neighbors table",
-                "query": "SELECT * FROM nebula.neighbors LIMIT 10000"
+                "description": "Full table scan of the neighbors table (projected columns)",
+                "query": f"SELECT {neighbors_cols} FROM nebula.neighbors LIMIT 10000",
+                "format_null": True
+            },
+            {
+                "name": "neighbors_full_table_scan_star",
+                "description": "Full table scan of the neighbors table, all columns",
+                "query": "SELECT * FROM nebula.neighbors LIMIT 10000",
+                "format_null": True
             },
             {
                 "name": "neighbors_count",
@@ -204,14 +333,17 @@ class NebulaBenchmarks(BenchmarkQueryCollection):
                 "name": "neighbors_with_join",
                 "description": "Neighbors with join to discovery_id_prefixes_x_peer_ids",
                 "query": """
-                SELECT 
+                SELECT
                     n.crawl_id,
                     dp.peer_id as peer,
                     dn.peer_id as neighbor
-                FROM nebula.neighbors n
-                JOIN nebula.discovery_id_prefixes_x_peer_ids dp ON n.peer_discovery_id_prefix = dp.discovery_id_prefix
-                JOIN nebula.discovery_id_prefixes_x_peer_ids dn ON n.neighbor_discovery_id_prefix = dn.discovery_id_prefix
-                LIMIT 10000
+                FROM (
+                    SELECT crawl_id, peer_discovery_id_prefix, neighbor_discovery_id_prefix
+                    FROM nebula.neighbors
+                    LIMIT 10000
+                ) AS n
+                INNER JOIN nebula.discovery_id_prefixes_x_peer_ids dp ON n.peer_discovery_id_prefix = dp.discovery_id_prefix
+                INNER JOIN nebula.discovery_id_prefixes_x_peer_ids dn ON n.neighbor_discovery_id_prefix = dn.discovery_id_prefix
                 """
             },
              
@@ -241,16 +373,16 @@ class NebulaBenchmarks(BenchmarkQueryCollection):
                 "name": "peer_connectivity_analysis",
                 "description": "Analyze peer connectivity",
                 "query": """
-                WITH 
-                    recent_crawl AS (
-                        SELECT id 
-                        FROM nebula.crawls 
-                        WHERE state = 'succeeded' 
-                        ORDER BY created_at DESC 
+                WITH
+                    (
+                        SELECT id
+                        FROM nebula.crawls
+                        WHERE state = 'succeeded'
+                        ORDER BY created_at DESC
                         LIMIT 1
-                    ),
+                    ) AS recent_id,
                     connected_peers AS (
-                        SELECT 
+                        SELECT
                             peer_id,
                             length(protocols) as protocol_count,
                             length(dial_maddrs) as dial_addr_count,
@@ -258,7 +390,7 @@ class NebulaBenchmarks(BenchmarkQueryCollection):
                             length(extra_maddrs) as extra_addr_count,
                             connect_maddr IS NOT NULL as is_connected
                         FROM nebula.visits
-                        WHERE crawl_id = (SELECT id FROM recent_crawl)
+                        WHERE crawl_id = recent_id
                     )
                 SELECT
                     is_connected,
@@ -271,4 +403,9 @@ class NebulaBenchmarks(BenchmarkQueryCollection):
                 GROUP BY is_connected
                 """
             }
-        ]
\ No newline at end of file
+        ]
+        # Normalize the Python-indentation whitespace once at build time so
+        # the strings sent, hashed and logged are clean single blocks
+        for q in queries:
+            q["query"] = dedent(q["query"]).strip()
+        return queries
@@ -3,13 +3,15 @@
 Example script to run the Nebula benchmark.
 """
 import os
-import argparse
 import logging
-import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-from benchmarks import ClickHouseBenchmark
-from benchmarks.query_definitions import NebulaBenchmarks
+from examples._common import (build_arg_parser, load_cached_table_info,
+                              load_config, load_json_file_cached,
+                              parse_memory_limits, parse_server_settings,
+                              resolve_compression, save_cached_table_info,
+                              scan_retry_file)
 
 # Set up logging
 logging.basicConfig(
@@ -19,80 +21,76 @@ logging.basicConfig(
 logger = logging.getLogger('nebula_benchmark')
 
 
-def parse_memory_limits(memory_limits_file):
-    """Parse a memory limits JSON file or string."""
-    if not memory_limits_file:
-        return {}
-        
-    if os.path.exists(memory_limits_file):
-        with open(memory_limits_file, 'r') as f:
-            return json.load(f)
-    else:
-        try:
-            return json.loads(memory_limits_file)
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON format for memory limits: {memory_limits_file}")
-            return {}
-
-
 def main():
     """Run the Nebula benchmark."""
     # Load environment variables from .env file
     load_dotenv()
     
-    parser = argparse.ArgumentParser(description='ClickHouse Nebula Benchmark Tool')
-    parser.add_argument('--host', help='ClickHouse host address (overrides env variable)')
-    parser.add_argument('--port', type=int, help='ClickHouse port (overrides env variable)')
-    parser.add_argument('--username', help='ClickHouse username (overrides env variable)')
-    parser.add_argument('--password', help='ClickHouse password (overrides env variable)')
-    parser.add_argument('--database', help='ClickHouse database (overrides env variable)')
-    parser.add_argument('--secure', type=bool, help='Use secure connection (overrides env variable)')
-    parser.add_argument('--output', default='nebula_benchmark_results.json', 
-                        help='Output file for results')
-    parser.add_argument('--runs', type=int, default=3, help='Number of runs per benchmark')
-    parser.add_argument('--env-file', default='.env', help='Path to environment file')
+    parser = build_arg_parser('ClickHouse Nebula Benchmark Tool',
+                              output_default='nebula_benchmark_results.json')
     parser.add_argument('--table-info', action='store_true', help='Show table information before running benchmarks')
-    parser.add_argument('--memory-limits', help='JSON file or string with memory limits for specific benchmarks')
-    parser.add_argument('--skip-benchmarks', help='Comma-separated list of benchmark names to skip')
     parser.add_argument('--retry-failed', help='JSON file with previous results to retry only failed benchmarks')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Run up to N distinct benchmarks concurrently (async client)')
+    parser.add_argument('--no-metadata-cache', action='store_true',
+                        help='Always query table info from the server instead of the on-disk cache')
+    parser.add_argument('--alt-hosts',
+                        help='Comma-separated replica hosts to spread parallel/async clients over')
     
     args = parser.parse_args()
-    
+
+    # Imported only once the arguments parse, so --help and usage errors
+    # skip the clickhouse-connect import cost
+    from benchmarks import ClickHouseBenchmark
+    from benchmarks.query_definitions import NebulaBenchmarks
+
+
     # Load from specified env file if provided
     if args.env_file and args.env_file != '.env':
         load_dotenv(args.env_file)
     
-    # Get connection details from environment variables with command line overrides
-    host = args.host or os.getenv('CLICKHOUSE_HOST')
-    port = args.port or int(os.getenv('CLICKHOUSE_PORT', 8443))
-    username = args.username or os.getenv('CLICKHOUSE_USER', 'default')
-    password = args.password or os.getenv('CLICKHOUSE_PASSWORD', '')
-    database = args.database or os.getenv('CLICKHOUSE_DATABASE', 'default')
-    secure_str = os.getenv('CLICKHOUSE_SECURE', 'true').lower()
-    secure = args.secure if args.secure is not None else (secure_str == 'true')
-    
+    # Resolve connection details (command line overrides env variables)
+    cfg = load_config(args)
+
     # Validate required parameters
-    if not host:
+    if not cfg.host:
         raise ValueError("ClickHouse host not provided. Set CLICKHOUSE_HOST in .env file or use --host argument.")
     
-    # Initialize benchmark
-    benchmark = ClickHouseBenchmark()
+    # Initialize benchmark; timings stay server-side (system.query_log),
+    # so parallel runs do not skew the measured durations
+    benchmark = ClickHouseBenchmark(max_parallel=args.parallel_runs)
     connected = benchmark.connect(
-        host=host,
-        port=port,
-        username=username,
-        password=password,
-        database=database,
-        secure=secure
+        host=cfg.host,
+        port=cfg.port,
+        username=cfg.username,
+        password=cfg.password,
+        database=cfg.database,
+        secure=cfg.secure,
+        compress=resolve_compression(args),
+        alt_hosts=args.alt_hosts
     )
     
     if not connected:
         logger.error("Failed to connect to ClickHouse. Exiting.")
         return 1
     
-    # Show table information if requested
+    # Show table information if requested. Table info is pure metadata, so
+    # it is reused from the previous results file on --retry-failed or from
+    # the on-disk cache before falling back to the system-table queries.
+    table_info = None
     if args.table_info:
-        table_info = benchmark.benchmark_table_info(database)
+        if not args.no_metadata_cache:
+            if args.retry_failed and os.path.exists(args.retry_failed):
+                try:
+                    table_info = load_json_file_cached(args.retry_failed).get("table_info")
+                except Exception as e:
+                    logger.warning(f"Could not read table info from retry file: {e}")
+            if table_info is None:
+                table_info = load_cached_table_info(cfg.host, cfg.database)
+        if table_info is None:
+            table_info = benchmark.benchmark_table_info(cfg.database)
+            if not args.no_metadata_cache:
+                save_cached_table_info(cfg.host, cfg.database, table_info)
         print("\n===== Table Information =====")
         for table_name, info in table_info.items():
             print(f"\nTable: {table_name}")
@@ -113,64 +111,69 @@ def main():
     # Parse memory limits if provided
     memory_limits = parse_memory_limits(args.memory_limits) if args.memory_limits else {}
     
-    # Parse skip benchmarks
-    skip_benchmarks = []
+    # Parse skip benchmarks into a set for O(1) membership checks
+    skip_benchmarks: set = set()
     if args.skip_benchmarks:
-        skip_benchmarks = [name.strip() for name in args.skip_benchmarks.split(',')]
-        
-    # Handle retry failed benchmarks if a previous result file is provided
+        skip_benchmarks = {name.strip() for name in args.skip_benchmarks.split(',')}
+
+    # Handle retry failed benchmarks if a previous result file is provided;
+    # scan_retry_file streams the file when ijson is available instead of
+    # materializing the whole previous result set
     if args.retry_failed and os.path.exists(args.retry_failed):
         try:
-            with open(args.retry_failed, 'r') as f:
-                previous_results = json.load(f)
-                
-            # Find which benchmarks failed
-            failed_benchmarks = []
-            for name, results in previous_results.get("detailed_results", {}).items():
-                if any("error" in result.get("additional_metrics", {}) for result in results):
-                    failed_benchmarks.append(name)
-                    
+            previous_names, failed_benchmarks = scan_retry_file(args.retry_failed)
+
             if failed_benchmarks:
-                logger.info(f"Retrying previously failed benchmarks: {', '.join(failed_benchmarks)}")
-                # Add these to the skip list (we'll invert it below)
-                skip_benchmarks.extend([name for name in previous_results.get("detailed_results", {}).keys() 
-                                      if name not in failed_benchmarks])
+                logger.info(f"Retrying previously failed benchmarks: {', '.join(sorted(failed_benchmarks))}")
+                # Skip everything that already succeeded in the previous run
+                skip_benchmarks |= previous_names - failed_benchmarks
         except Exception as e:
             logger.error(f"Failed to process retry file: {e}")
     
-    # Add benchmark queries
+    # Add benchmark queries, filtering the skip set up front so skipped
+    # benchmarks are never even registered
     nebula_benchmarks = NebulaBenchmarks()
-    benchmark.add_benchmarks_from_list(nebula_benchmarks.get_queries())
-    
-    # Update run count if specified
-    if args.runs != 3:
-        for bm in benchmark.benchmarks:
-            bm.run_count = args.runs
-    
-    # Run benchmarks
-    results = benchmark.run_all_benchmarks(memory_limits=memory_limits, skip_benchmarks=skip_benchmarks)
-    
-    # Save and print results
-    benchmark.save_results_to_file(results, args.output)
-    benchmark.print_summary_table(results)
-    
+    benchmark.add_benchmarks_from_list(nebula_benchmarks.get_queries(skip=skip_benchmarks),
+                                       default_run_count=args.runs)
+
+    # Run benchmarks (the skip set was already applied above); with
+    # --concurrency > 1 distinct benchmarks overlap on the async client
+    # while each benchmark's runs stay sequential
+    server_settings = parse_server_settings(args.server_settings)
+    if args.concurrency > 1:
+        import asyncio
+        results = asyncio.run(benchmark.run_all_benchmarks_async(
+            memory_limits=memory_limits,
+            concurrency=args.concurrency,
+            server_settings=server_settings,
+            result_cache=args.result_cache
+        ))
+    else:
+        results = benchmark.run_all_benchmarks(memory_limits=memory_limits,
+                                               server_settings=server_settings,
+                                               result_cache=args.result_cache)
+    
+    # Save and print results; keep table info inside the results file so a
+    # later --retry-failed pass can reuse it without hitting the server.
+    # The JSON dump runs on a worker thread so it overlaps with building
+    # and printing the summary table.
+    if table_info is not None:
+        results["table_info"] = table_info
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        save_future = executor.submit(benchmark.save_results_to_file, results, args.output)
+        benchmark.print_summary_table(results)
+        save_future.result()
+
     logger.info(f"Benchmark results saved to {args.output}")
     
-    # Check if any benchmarks failed, use as exit code
-    failed = False
-    for benchmark_summary in results.get("benchmark_summary", []):
-        if benchmark_summary.get("error_count", 0) > 0:
-            failed = True
-            break
-    
-    for benchmark_name, benchmark_results in results.get("detailed_results", {}).items():
-        for result in benchmark_results:
-            if "additional_metrics" in result and "error" in result["additional_metrics"]:
-                failed = True
-                break
-        if failed:
-            break
-    
+    # Check if any benchmarks failed, use as exit code; the generators
+    # short-circuit at the first errored summary or run
+    failed = (any(bs.get("error_count", 0) > 0
+                  for bs in results.get("benchmark_summary", []))
+              or any("error" in result.get("additional_metrics", {})
+                     for benchmark_results in results.get("detailed_results", {}).values()
+                     for result in benchmark_results))
+
     logger.info("All benchmarks completed successfully" if not failed else "Some benchmarks failed")
     return 1 if failed else 0
 
@@ -11,11 +11,17 @@ setup(
     author="Your Name",
     author_email="your.email@example.com",
     packages=find_packages(include=['benchmarks', 'benchmarks.*', 'examples', 'examples.*']),
-    python_requires=">=3.7",
+    python_requires=">=3.10",
     install_requires=[
         "clickhouse-connect>=0.6.0",
         "python-dotenv>=1.0.0",
     ],
+    extras_require={
+        "lz4": ["lz4"],
+        "zstd": ["zstandard"],
+        "async": ["aiohttp>=3.8"],
+        "fast-json": ["orjson>=3.8", "ijson>=3.2"],
+    },
     entry_points={
         "console_scripts": [
             "ch-benchmark=examples.run_nebula_benchmark:main",
@@ -27,9 +33,8 @@ setup(
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
     ],
 )
\ No newline at end of file